@@ -3,36 +3,225 @@
 import socket
 import struct
 import time
+import os
+import functools
 import argparse
 import sys
+import ctypes
+import ctypes.util
 
-def create_tally_message(source_name, state):
-    """Create an NDI tally message in the VISCA-SRT protocol format."""
-    timestamp = int(time.time())
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+# Number of tally frames flushed per sendmmsg() call in burst mode
+BATCH_SIZE = 100
+
+# io_uring submission queue depth for burst mode (must be at least BATCH_SIZE)
+URING_QUEUE_DEPTH = 128
+
+class iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p),
+                ("iov_len", ctypes.c_size_t)]
+
+class msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p),
+                ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(iovec)),
+                ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p),
+                ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+class mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", msghdr),
+                ("msg_len", ctypes.c_uint)]
+
+def _load_sendmmsg():
+    """Return libc's sendmmsg() on Linux, or None if unavailable."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        sendmmsg = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(mmsghdr), ctypes.c_uint, ctypes.c_int]
+    sendmmsg.restype = ctypes.c_int
+    return sendmmsg
+
+_sendmmsg = _load_sendmmsg()
+
+# On Linux, MSG_CONFIRM tells the kernel the peer is reachable so it can
+# skip neighbour (ARP) re-validation on every datagram
+SEND_FLAGS = getattr(socket, "MSG_CONFIRM", 0) if sys.platform.startswith("linux") else 0
+
+# Socket buffer size (matches net.core.wmem_max/rmem_max = 12582912). Linux
+# silently caps the request at the sysctl limit; macOS/BSD instead reject sizes
+# above kern.ipc.maxsockbuf with ENOBUFS, so set_socket_buffer() retries smaller.
+SOCKET_BUFFER_SIZE = 12 * 1024 * 1024
+MIN_SOCKET_BUFFER_SIZE = 64 * 1024
+
+# Precompiled packer for the 4-byte big-endian message timestamp
+_TS_PACKER = struct.Struct('!l')
+
+# Mark tally datagrams as DSCP EF (Expedited Forwarding) so switches queue
+# them ahead of bulk SRT video, and use a high socket priority on Linux
+TALLY_IP_TOS = 0xB8
+TALLY_SO_PRIORITY = 6
+
+# Tally state names, indexed by state value
+_STATE_NAMES = ("OFF", "PROGRAM", "PREVIEW", "PROGRAM+PREVIEW")
+
+def set_socket_buffer(sock, option, size):
+    """Set SO_SNDBUF/SO_RCVBUF to size, halving it until the kernel accepts it.
+
+    Returns the size that was set, or None if the default buffer was kept.
+    """
+    while size >= MIN_SOCKET_BUFFER_SIZE:
+        try:
+            sock.setsockopt(socket.SOL_SOCKET, option, size)
+            return size
+        except OSError:
+            size //= 2
+    return None
+
+def create_tally_buffer(source_name):
+    """Preallocate a reusable tally message with the fixed fields filled in.
+
+    Only the tally state and timestamp change between sends, so they are
+    written in place by send_tally_state().
+    """
+    name = source_name.encode()
+    buf = bytearray(7 + len(name))
     # Protocol type (0x02 for NDI tally)
-    msg = bytearray([0x02])
-    # Tally state
-    msg.extend([state])
+    buf[0] = 0x02
     # Source name length
-    msg.extend([len(source_name)])
-    # Timestamp (4 bytes, big-endian)
-    msg.extend(struct.pack('!l', timestamp))
+    buf[2] = len(name)
     # Source name
-    msg.extend(source_name.encode())
-    return msg
+    buf[7:] = name
+    return buf
+
+class TallyBatch:
+    """A fixed set of tally frames plus sendmmsg() headers pointing into them.
 
-def send_tally_state(sock, source_name, state, verbose=False):
-    """Send a tally state message to the VISCA-SRT server."""
-    msg = create_tally_message(source_name, state)
-    sock.send(msg)
+    The headers are built once, so the frames can be updated in place and
+    resent without any per-send allocation.
+    """
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.hdrs = None
+        if _sendmmsg is None:
+            return
+        count = len(frames)
+        # Keep the buffer views and iovecs alive for as long as the headers
+        self._views = [(ctypes.c_char * len(frame)).from_buffer(frame) for frame in frames]
+        self._iovs = (iovec * count)()
+        self.hdrs = (mmsghdr * count)()
+        for i, view in enumerate(self._views):
+            self._iovs[i].iov_base = ctypes.addressof(view)
+            self._iovs[i].iov_len = len(view)
+            self.hdrs[i].msg_hdr.msg_iov = ctypes.pointer(self._iovs[i])
+            self.hdrs[i].msg_hdr.msg_iovlen = 1
+
+def create_tally_batch(buf, count):
+    """Copy a create_tally_buffer() template into count frames cycling through the tally states.
+
+    The returned TallyBatch can be reused for every send; only the frame
+    timestamps need updating.
+    """
+    frames = [bytearray(buf) for _ in range(count)]
+    for i, frame in enumerate(frames):
+        frame[1] = i % len(_STATE_NAMES)
+    return TallyBatch(frames)
+
+def send_tally_state(send, buf, source_name, state, verbose=False):
+    """Send a tally state message to the VISCA-SRT server.
+
+    send is a callable that writes one datagram to the connected socket, and
+    buf is a message buffer from create_tally_buffer() for source_name.
+    """
+    buf[1] = state
+    _TS_PACKER.pack_into(buf, 3, int(time.time()))
+    send(buf)
     if verbose:
-        state_names = {
-            0x00: "OFF",
-            0x01: "PROGRAM",
-            0x02: "PREVIEW",
-            0x03: "PROGRAM+PREVIEW"
-        }
-        print(f"Sent tally state {state_names.get(state, 'UNKNOWN')} to {source_name}")
+        name = _STATE_NAMES[state] if state < len(_STATE_NAMES) else "UNKNOWN"
+        sys.stdout.write(f"Sent tally state {name} to {source_name}\n")
+
+def send_tally_batch(sock, batch):
+    """Send a TallyBatch on a connected UDP socket.
+
+    On Linux all frames are flushed with a single sendmmsg() call; other
+    platforms fall back to one send() per frame.
+    """
+    if batch.hdrs is None:
+        for frame in batch.frames:
+            sock.send(frame, SEND_FLAGS)
+        return
+
+    fd = sock.fileno()
+    count = len(batch.frames)
+    sent = 0
+    while sent < count:
+        n = _sendmmsg(fd, ctypes.byref(batch.hdrs[sent]), count - sent, SEND_FLAGS)
+        if n < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        sent += n
+
+def create_uring():
+    """Set up an io_uring for burst sends.
+
+    Returns None if the liburing bindings are not installed, the kernel has
+    no io_uring support, or it lacks IORING_OP_SEND (added in Linux 5.6); in
+    that case callers use send_tally_batch().
+    """
+    if liburing is None:
+        return None
+    ring = liburing.Ring()
+    try:
+        liburing.io_uring_queue_init(URING_QUEUE_DEPTH, ring)
+    except OSError:
+        return None
+
+    probe = liburing.io_uring_get_probe_ring(ring)
+    try:
+        supported = liburing.io_uring_opcode_supported(probe, liburing.io_uring_op.IORING_OP_SEND)
+    finally:
+        liburing.io_uring_free_probe(probe)
+    if not supported:
+        liburing.io_uring_queue_exit(ring)
+        return None
+    return ring
+
+def send_tally_batch_uring(ring, sock, batch):
+    """Send a TallyBatch on a connected UDP socket via io_uring.
+
+    All sends are queued and submitted with a single io_uring_enter() call.
+    """
+    fd = sock.fileno()
+    for frame in batch.frames:
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_send(sqe, fd, frame, SEND_FLAGS)
+    liburing.io_uring_submit(ring)
+
+    # Reap one completion at a time so liburing handles wrap-around of the
+    # completion ring. Reading res raises OSError for a failed send; mark every
+    # entry seen so the ring stays consistent, then re-raise the first error.
+    cqe = liburing.Cqe()
+    error = None
+    for _ in batch.frames:
+        liburing.io_uring_wait_cqe(ring, cqe)
+        entry = cqe[0]
+        try:
+            entry.res
+        except OSError as e:
+            error = error or e
+        liburing.io_uring_cqe_seen(ring, entry)
+    if error is not None:
+        raise error
 
 def main():
     parser = argparse.ArgumentParser(description="Test NDI tally functionality in VISCA-SRT proxy")
@@ -44,28 +233,82 @@ def main():
                         help="Tally state (0=Off, 1=Program, 2=Preview, 3=Both)")
     parser.add_argument("--interval", type=float, default=2.0, 
                         help="Interval between state changes in cycle mode")
+    parser.add_argument("--burst", action="store_true",
+                        help="Stress test: cycle states without sleeping, sending batches of messages")
     parser.add_argument("-v", "--verbose", action="store_true", help="Enable verbose output")
     
     args = parser.parse_args()
 
+    sock = None
     try:
-        # Create UDP socket
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-        sock.connect((args.host, args.port))
+        # Resolve the server address once and create a matching UDP socket
+        family, socktype, proto, _, addr = socket.getaddrinfo(
+            args.host, args.port, socket.AF_INET, socket.SOCK_DGRAM)[0]
+        sock = socket.socket(family, socktype, proto)
+        for option, option_name in ((socket.SO_SNDBUF, "send"), (socket.SO_RCVBUF, "receive")):
+            size = set_socket_buffer(sock, option, SOCKET_BUFFER_SIZE)
+            if size is None:
+                print(f"Warning: could not enlarge the socket {option_name} buffer; using the default")
+            elif size != SOCKET_BUFFER_SIZE:
+                print(f"Warning: socket {option_name} buffer limited to {size} bytes by the system")
+        # Set IP_TOS first: on Linux it resets the socket priority
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_TOS, TALLY_IP_TOS)
+        if sys.platform.startswith("linux"):
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_PRIORITY, TALLY_SO_PRIORITY)
+        if args.verbose:
+            sndbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+            rcvbuf = sock.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
+            if sys.platform.startswith("linux"):
+                # Linux doubles the requested size to account for bookkeeping
+                # overhead and reports the doubled value; show the usable size
+                sndbuf //= 2
+                rcvbuf //= 2
+            print(f"Socket buffers: send {sndbuf} bytes, receive {rcvbuf} bytes "
+                  f"(requested {SOCKET_BUFFER_SIZE})")
+        sock.connect(addr)
+
+        buf = create_tally_buffer(args.source)
 
         if args.cycle:
             print(f"Cycling tally states for source {args.source}")
             try:
-                while True:
-                    for state in [0, 1, 2, 3]:
-                        send_tally_state(sock, args.source, state, args.verbose)
-                        time.sleep(args.interval)
+                if args.burst:
+                    ring = create_uring()
+                    if args.verbose:
+                        print(f"Burst sends using {'io_uring' if ring is not None else 'sendmmsg'}")
+                    batch = create_tally_batch(buf, BATCH_SIZE)
+                    try:
+                        while True:
+                            timestamp = int(time.time())
+                            for frame in batch.frames:
+                                _TS_PACKER.pack_into(frame, 3, timestamp)
+                            if ring is not None:
+                                send_tally_batch_uring(ring, sock, batch)
+                            else:
+                                send_tally_batch(sock, batch)
+                            if args.verbose:
+                                print(f"Sent batch of {BATCH_SIZE} tally states to {args.source}")
+                    finally:
+                        if ring is not None:
+                            liburing.io_uring_queue_exit(ring)
+                else:
+                    # write(2) on the connected UDP fd is equivalent to send() without flags,
+                    # and skips the socket object's timeout handling on every frame
+                    send = functools.partial(os.write, sock.fileno())
+                    # Schedule against absolute deadlines so send time doesn't accumulate as drift
+                    deadline = time.monotonic()
+                    while True:
+                        for state in [0, 1, 2, 3]:
+                            send_tally_state(send, buf, args.source, state, args.verbose)
+                            deadline += args.interval
+                            time.sleep(max(0, deadline - time.monotonic()))
             except KeyboardInterrupt:
                 print("\nStopping tally cycle")
         else:
             if args.state is None:
                 parser.error("--state is required when not using --cycle")
-            send_tally_state(sock, args.source, args.state, args.verbose)
+            send_tally_state(lambda data: sock.send(data, SEND_FLAGS), buf, args.source,
+                             args.state, args.verbose)
 
     except ConnectionRefusedError:
         print(f"Error: Could not connect to {args.host}:{args.port}")
@@ -74,7 +317,8 @@ def main():
         print(f"Error: {e}")
         return 1
     finally:
-        sock.close()
+        if sock:
+            sock.close()
 
     return 0
 
@@ -2,51 +2,162 @@
 
 import srt
 import sys
+import asyncio
 import time
 import socket
+import struct
 import threading
 
-# Set script as executable if run directly
-if __name__ == "__main__":
-    sys.exit(main())
+# Typical SRT payload size (7 MPEG-TS packets of 188 bytes)
+SRT_PAYLOAD_SIZE = 1316
+
+# Each application message is framed with a 2-byte big-endian length prefix
+_LENGTH_PREFIX = struct.Struct('!H')
+
+def frame_message(message, max_size=SRT_PAYLOAD_SIZE):
+    """Prefix a message with its length so several can share one SRT packet.
+
+    Raises ValueError if the framed message would not fit in max_size bytes.
+    """
+    if _LENGTH_PREFIX.size + len(message) > max_size:
+        raise ValueError(f"Message of {len(message)} bytes does not fit in a "
+                         f"{max_size}-byte SRT payload with its length prefix")
+    return _LENGTH_PREFIX.pack(len(message)) + message
+
+def batch_messages(messages, max_size=SRT_PAYLOAD_SIZE):
+    """Pack framed messages into as few buffers of at most max_size bytes as possible.
+
+    Raises ValueError if any single message is too large to fit in max_size.
+    """
+    batches = []
+    batch = bytearray()
+    for message in messages:
+        if batch and len(batch) + _LENGTH_PREFIX.size + len(message) > max_size:
+            batches.append(bytes(batch))
+            batch.clear()
+        batch += frame_message(message, max_size)
+    if batch:
+        batches.append(bytes(batch))
+    return batches
+
+def unpack_messages(data):
+    """Split a buffer of framed messages back into the individual messages.
+
+    Raises ValueError if data ends partway through a length prefix or a
+    prefix claims more bytes than remain.
+    """
+    messages = []
+    offset = 0
+    while offset < len(data):
+        if len(data) - offset < _LENGTH_PREFIX.size:
+            raise ValueError(f"Truncated length prefix at offset {offset}")
+        (length,) = _LENGTH_PREFIX.unpack_from(data, offset)
+        offset += _LENGTH_PREFIX.size
+        if length > len(data) - offset:
+            raise ValueError(f"Frame of {length} bytes at offset {offset} overruns "
+                             f"the {len(data)}-byte payload")
+        messages.append(data[offset:offset + length])
+        offset += length
+    return messages
+
+# SRT error codes reported for send/receive timeouts and connection setup timeouts
+_TIMEOUT_ERRORS = tuple(getattr(srt, name) for name in ('SRT_ETIMEOUT', 'SRT_ENOSERVER') if hasattr(srt, name))
+# Fallback for bindings whose SRTError doesn't carry an error code
+_TIMEOUT_MSG = "Connection timed out"
+
+def is_timeout(error):
+    """Return True if an SRTError was caused by a timeout."""
+    code = getattr(error, 'errno', None)
+    if code is not None and _TIMEOUT_ERRORS:
+        return code in _TIMEOUT_ERRORS
+    return _TIMEOUT_MSG in str(error)
+
+def epoll_wait_ready(eid, timeout_ms):
+    """Wait on an SRT epoll set and return the sockets ready for reading.
+
+    libsrt reports "nothing became ready before the timeout" as an
+    SRT_ETIMEOUT error; that case is returned as an empty list.
+    """
+    try:
+        ready, _ = srt.epoll_wait(eid, timeout_ms / 1000)
+    except srt.SRTError as e:
+        if is_timeout(e):
+            return []
+        raise
+    return ready
+
+def send_message(sock, data):
+    """Send data as a single SRT message.
+
+    With SRTO_MESSAGEAPI every send is one message, so the unsent tail of a
+    short send can't be resent without splitting a frame across two messages;
+    a short send raises RuntimeError instead.
+    """
+    sent = sock.send(data)
+    if sent != len(data):
+        raise RuntimeError(f"SRT sent {sent} of {len(data)} bytes of a message")
 
-def create_srt_socket():
-    """Create and configure a basic SRT socket with recommended settings."""
+def resolve_address(host, port):
+    """Resolve host and port to an IPv4 socket address once, so it can be reused."""
+    return socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+
+def create_srt_socket(latency_ms=20, buffer_bytes=None, conntimeo_ms=3000):
+    """Create and configure a basic SRT socket with recommended settings.
+
+    latency_ms sets the TSBPD receive buffering delay added to every message.
+    Lower values deliver small interactive messages sooner but leave less time
+    to retransmit lost packets; raise it (e.g. 120-200 ms) on lossy or
+    long-haul links. 20 ms is plenty for peers on the same host or LAN.
+
+    By default libsrt sizes its send and receive buffers from the flow control
+    window and latency; pass buffer_bytes only to force a fixed size.
+    """
     sock = srt.socket()
-    # Set send and receive buffer sizes
-    sock.setsockopt(srt.SRTO_RCVBUF, 1024*1024)
-    sock.setsockopt(srt.SRTO_SNDBUF, 1024*1024)
+    if buffer_bytes is not None:
+        # Set send and receive buffer sizes
+        sock.setsockopt(srt.SRTO_RCVBUF, buffer_bytes)
+        sock.setsockopt(srt.SRTO_SNDBUF, buffer_bytes)
     # Set connection timeout (ms)
-    sock.setsockopt(srt.SRTO_CONNTIMEO, 3000)
+    sock.setsockopt(srt.SRTO_CONNTIMEO, conntimeo_ms)
     # Enable message API
     sock.setsockopt(srt.SRTO_MESSAGEAPI, True)
+    # Maximum payload per packet; batch_messages() fills packets up to this size
+    sock.setsockopt(srt.SRTO_PAYLOADSIZE, SRT_PAYLOAD_SIZE)
     # Set latency (ms)
-    sock.setsockopt(srt.SRTO_LATENCY, 200)
+    sock.setsockopt(srt.SRTO_LATENCY, latency_ms)
     return sock
 
-def srt_caller(host='127.0.0.1', port=9000, timeout_ms=3000):
-    """Example of SRT caller mode."""
+def srt_caller(host='127.0.0.1', port=9000, timeout_ms=3000, latency_ms=20, pace_bps=None):
+    """Example of SRT caller mode.
+
+    The test messages are sent as soon as the connection is up. Pass pace_bps
+    to have libsrt rate-limit egress to that many bytes per second
+    (SRTO_MAXBW) instead of sleeping between sends.
+    """
     sock = None
     
     try:
-        sock = create_srt_socket()
-        # Set specific timeout for this connection
-        sock.setsockopt(srt.SRTO_CONNTIMEO, timeout_ms)
+        sock = create_srt_socket(latency_ms, conntimeo_ms=timeout_ms)
+        # Set send timeout for this connection
         sock.setsockopt(srt.SRTO_SNDTIMEO, timeout_ms)
+        if pace_bps is not None:
+            # Let libsrt meter the send rate
+            sock.setsockopt(srt.SRTO_MAXBW, pace_bps)
         
         print(f"[Caller] Connecting to {host}:{port}")
-        sock.connect((host, port))
+        sock.connect(resolve_address(host, port))
         print("[Caller] Connected successfully")
+        print(f"[Caller] Send buffer: {sock.getsockopt(srt.SRTO_SNDBUF)} bytes")
         
-        # Send some test data
-        for i in range(5):
+        # Send some test data, packing the messages into as few SRT packets as possible
+        messages = [f"Caller message {i}".encode() for i in range(5)]
+        for batch in batch_messages(messages):
             try:
-                message = f"Caller message {i}".encode()
-                sock.send(message)
-                print(f"[Caller] Sent: {message.decode()}")
-                time.sleep(1)
+                send_message(sock, batch)
+                for message in unpack_messages(batch):
+                    print(f"[Caller] Sent: {message.decode()}")
             except srt.SRTError as e:
-                if "Connection timed out" in str(e):
+                if is_timeout(e):
                     print("[Caller] Send timeout")
                     break
                 raise
@@ -63,113 +174,183 @@ def srt_caller(host='127.0.0.1', port=9000, timeout_ms=3000):
             except Exception as e:
                 print(f"[Caller] Error closing socket: {e}")
 
-def srt_listener(host='127.0.0.1', port=9000, timeout_ms=3000):
-    """Example of SRT listener mode."""
-    sock = None
-    client_sock = None
+def srt_listener(host='127.0.0.1', port=9000, timeout_ms=3000, latency_ms=20, listeners=1):
+    """Example of SRT listener mode.
+
+    A single thread serves any number of callers: the listening sockets and
+    every accepted connection share one SRT epoll set. libsrt runs one receive
+    queue per bound port, so with many streams pass listeners=K to listen on
+    ports port..port+K-1 and spread callers across them. Each caller is dropped
+    when it disconnects, fails, or sends nothing for timeout_ms; the listener
+    exits once its last caller is gone.
+    """
+    servers = []
+    clients = {}
+    last_active = {}
+    eid = None
+    
+    def drop_client(client_sock):
+        srt.epoll_remove_usock(eid, client_sock)
+        del clients[client_sock]
+        del last_active[client_sock]
+        client_sock.close()
     
     try:
-        sock = create_srt_socket()
-        # Set specific timeout for this connection
-        sock.setsockopt(srt.SRTO_CONNTIMEO, timeout_ms)
-        
-        sock.bind((host, port))
-        sock.listen(1)
-        print(f"[Listener] Listening on {host}:{port}")
+        # Wait for readiness with SRT epoll instead of blocking in accept/recv
+        eid = srt.epoll_create()
         
-        client_sock, addr = sock.accept()
-        print(f"[Listener] Accepted connection from {addr}")
-        
-        # Set receive timeout for client socket
-        client_sock.setsockopt(srt.SRTO_RCVTIMEO, timeout_ms)
+        for listen_port in range(port, port + listeners):
+            sock = create_srt_socket(latency_ms, conntimeo_ms=timeout_ms)
+            servers.append(sock)
+            
+            sock.bind(resolve_address(host, listen_port))
+            sock.listen(16)
+            srt.epoll_add_usock(eid, sock, srt.EPOLL_IN)
+            print(f"[Listener] Listening on {host}:{listen_port}")
         
         while True:
-            try:
-                data = client_sock.recv(1024)
+            ready = epoll_wait_ready(eid, timeout_ms)
+            now = time.monotonic()
+            
+            for sock in ready:
+                if sock in servers:
+                    client_sock, addr = sock.accept()
+                    clients[client_sock] = addr
+                    last_active[client_sock] = now
+                    srt.epoll_add_usock(eid, client_sock, srt.EPOLL_IN)
+                    print(f"[Listener] Accepted connection from {addr}")
+                    print(f"[Listener] Receive buffer: {client_sock.getsockopt(srt.SRTO_RCVBUF)} bytes")
+                    continue
+                
+                addr = clients[sock]
+                try:
+                    data = sock.recv(SRT_PAYLOAD_SIZE)
+                except srt.SRTError as e:
+                    print(f"[Listener] Connection to {addr} failed: {e}")
+                    drop_client(sock)
+                    continue
                 if not data:
-                    print("[Listener] Connection closed by peer")
-                    break
-                print(f"[Listener] Received: {data.decode()}")
-            except srt.SRTError as e:
-                if "Connection timed out" in str(e):
-                    print("[Listener] Receive timeout")
-                    break
-                raise
+                    print(f"[Listener] Connection closed by peer {addr}")
+                    drop_client(sock)
+                    continue
+                last_active[sock] = now
+                try:
+                    messages = [message.decode() for message in unpack_messages(data)]
+                except (ValueError, UnicodeDecodeError) as e:
+                    print(f"[Listener] Malformed message from {addr}: {e}")
+                    drop_client(sock)
+                    continue
+                for message in messages:
+                    print(f"[Listener] Received from {addr}: {message}")
+            
+            if not ready and not clients:
+                # Still waiting for the first caller
+                continue
+            
+            for client_sock in [c for c, t in last_active.items() if now - t >= timeout_ms / 1000]:
+                print(f"[Listener] Receive timeout from {clients[client_sock]}")
+                drop_client(client_sock)
+            
+            if not clients:
+                break
             
     except Exception as e:
         print(f"[Listener] Error: {e}")
     finally:
-        if client_sock:
+        if eid is not None:
+            srt.epoll_release(eid)
+        
+        for client_sock in clients:
             try:
                 client_sock.close()
                 print("[Listener] Client connection closed")
             except Exception as e:
                 print(f"[Listener] Error closing client socket: {e}")
         
-        if sock:
+        for sock in servers:
             try:
                 sock.close()
                 print("[Listener] Server closed")
             except Exception as e:
                 print(f"[Listener] Error closing server socket: {e}")
 
-def srt_rendezvous(host='127.0.0.1', port=9000, peer_host='127.0.0.1', peer_port=9001, timeout_ms=3000):
+async def _rendezvous_send(sock, messages):
+    """Send messages to the rendezvous peer, packing them into as few SRT packets as possible."""
+    loop = asyncio.get_running_loop()
+    for batch in batch_messages(messages):
+        try:
+            await loop.run_in_executor(None, send_message, sock, batch)
+            for message in unpack_messages(batch):
+                print(f"[Rendezvous] Sent: {message.decode()}")
+        except srt.SRTError as e:
+            if is_timeout(e):
+                print("[Rendezvous] Send timeout")
+                return
+            raise
+
+async def _rendezvous_receive(sock, eid, timeout_ms):
+    """Receive the peer's messages until it goes quiet, only calling recv once epoll reports data."""
+    loop = asyncio.get_running_loop()
+    while True:
+        ready = await loop.run_in_executor(None, epoll_wait_ready, eid, timeout_ms)
+        if not ready:
+            break
+        data = sock.recv(SRT_PAYLOAD_SIZE)
+        if not data:
+            print("[Rendezvous] Connection closed by peer")
+            break
+        for message in unpack_messages(data):
+            print(f"[Rendezvous] Received: {message.decode()}")
+
+async def _rendezvous_exchange(sock, eid, messages, timeout_ms):
+    """Run the rendezvous sender and receiver at the same time."""
+    await asyncio.gather(_rendezvous_send(sock, messages),
+                         _rendezvous_receive(sock, eid, timeout_ms))
+
+def srt_rendezvous(host='127.0.0.1', port=9000, peer_host='127.0.0.1', peer_port=9001, timeout_ms=3000,
+                   latency_ms=20):
     """Example of SRT rendezvous mode."""
     sock = None
+    eid = None
     
     try:
-        sock = create_srt_socket()
-        # Set specific timeouts for this connection
-        sock.setsockopt(srt.SRTO_CONNTIMEO, timeout_ms)
+        sock = create_srt_socket(latency_ms, conntimeo_ms=timeout_ms)
+        # Set send timeout for this connection
         sock.setsockopt(srt.SRTO_SNDTIMEO, timeout_ms)
-        sock.setsockopt(srt.SRTO_RCVTIMEO, timeout_ms)
         
         # Enable rendezvous mode
         sock.setsockopt(srt.SRTO_RENDEZVOUS, 1)
         
         # Bind to local address
-        sock.bind((host, port))
+        sock.bind(resolve_address(host, port))
         print(f"[Rendezvous] Binding to {host}:{port}")
         print(f"[Rendezvous] Connecting to peer at {peer_host}:{peer_port}")
         
         # Attempt rendezvous connection
         try:
-            sock.connect((peer_host, peer_port))
+            sock.connect(resolve_address(peer_host, peer_port))
             print("[Rendezvous] Connected in rendezvous mode")
+            print(f"[Rendezvous] Send buffer: {sock.getsockopt(srt.SRTO_SNDBUF)} bytes")
         except srt.SRTError as e:
-            if "Connection timed out" in str(e):
+            if is_timeout(e):
                 print("[Rendezvous] Connection attempt timed out")
                 return
             raise
         
-        # Send some test data
-        for i in range(5):
-            try:
-                message = f"Rendezvous message {i}".encode()
-                sock.send(message)
-                print(f"[Rendezvous] Sent: {message.decode()}")
-                
-                # Try to receive response
-                try:
-                    data = sock.recv(1024)
-                    if data:
-                        print(f"[Rendezvous] Received: {data.decode()}")
-                except srt.SRTError as e:
-                    if "Connection timed out" not in str(e):
-                        raise
-                
-                time.sleep(1)
-            except srt.SRTError as e:
-                if "Connection timed out" in str(e):
-                    print("[Rendezvous] Send timeout")
-                    break
-                raise
+        # Send and receive concurrently so neither direction waits on the other
+        messages = [f"Rendezvous message {i}".encode() for i in range(5)]
+        eid = srt.epoll_create()
+        srt.epoll_add_usock(eid, sock, srt.EPOLL_IN)
+        asyncio.run(_rendezvous_exchange(sock, eid, messages, timeout_ms))
             
     except srt.SRTError as e:
         print(f"[Rendezvous] SRT Error: {e}")
     except Exception as e:
         print(f"[Rendezvous] General Error: {e}")
     finally:
+        if eid is not None:
+            srt.epoll_release(eid)
+        
         if sock:
             try:
                 sock.close()
@@ -177,23 +358,49 @@ def srt_rendezvous(host='127.0.0.1', port=9000, peer_host='127.0.0.1', peer_port
             except Exception as e:
                 print(f"[Rendezvous] Error closing socket: {e}")
 
+def print_usage():
+    print("Usage: python srt_examples.py <mode> [options]")
+    print("\nModes:")
+    print("  caller     - Start in caller (client) mode")
+    print("  listener   - Start in listener (server) mode")
+    print("  rendezvous - Start in rendezvous (peer-to-peer) mode")
+    print("\nOptions:")
+    print("  peer2      - For rendezvous mode, use alternate port configuration")
+    print("  --pace BPS - For caller mode, limit the send rate to BPS bytes per second")
+    print("  --listeners N - For listener mode, listen on N consecutive ports from 9000")
+
+def positive_int_option(args, name):
+    """Return the positive integer following option name in args, or None if the option is absent."""
+    if name not in args:
+        return None
+    index = args.index(name) + 1
+    try:
+        value = int(args[index])
+    except (IndexError, ValueError):
+        raise ValueError(f"{name} requires a positive integer value") from None
+    if value <= 0:
+        raise ValueError(f"{name} requires a positive integer value")
+    return value
+
 def main():
     if len(sys.argv) < 2 or sys.argv[1] in ['--help', '-h']:
-        print("Usage: python srt_examples.py <mode> [options]")
-        print("\nModes:")
-        print("  caller     - Start in caller (client) mode")
-        print("  listener   - Start in listener (server) mode")
-        print("  rendezvous - Start in rendezvous (peer-to-peer) mode")
-        print("\nOptions:")
-        print("  peer2      - For rendezvous mode, use alternate port configuration")
-        return 0 if sys.argv[1] in ['--help', '-h'] else 1
+        print_usage()
+        return 0 if len(sys.argv) > 1 else 1
 
     mode = sys.argv[1].lower()
     
+    try:
+        pace_bps = positive_int_option(sys.argv[2:], "--pace")
+        listeners = positive_int_option(sys.argv[2:], "--listeners") or 1
+    except ValueError as e:
+        print(f"Error: {e}")
+        print_usage()
+        return 1
+    
     if mode == "caller":
-        srt_caller()
+        srt_caller(pace_bps=pace_bps)
     elif mode == "listener":
-        srt_listener()
+        srt_listener(listeners=listeners)
     elif mode == "rendezvous":
         # For rendezvous, we need two instances running with swapped ports
         if len(sys.argv) > 2 and sys.argv[2] == "peer2":
@@ -202,6 +409,8 @@ def main():
             srt_rendezvous(port=9000, peer_port=9001)
     else:
         print(f"Unknown mode: {mode}")
+        return 1
+    return 0
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
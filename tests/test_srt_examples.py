@@ -0,0 +1,66 @@
+import os
+import sys
+import types
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+# The framing helpers don't touch libsrt; allow importing them without the binding
+try:
+    import srt  # noqa: F401
+except ImportError:
+    sys.modules["srt"] = types.ModuleType("srt")
+
+import srt_examples
+
+
+class MessageFramingTest(unittest.TestCase):
+    def test_frame_message_prefixes_length(self):
+        self.assertEqual(srt_examples.frame_message(b"abc"), b"\x00\x03abc")
+
+    def test_batch_round_trip(self):
+        messages = [f"Caller message {i}".encode() for i in range(5)] + [b""]
+        batches = srt_examples.batch_messages(messages)
+        self.assertEqual(len(batches), 1)
+        unpacked = [m for batch in batches for m in srt_examples.unpack_messages(batch)]
+        self.assertEqual(unpacked, messages)
+
+    def test_batches_respect_max_size(self):
+        messages = [b"a" * 700, b"b" * 700, b"c" * 5]
+        batches = srt_examples.batch_messages(messages)
+        self.assertEqual(len(batches), 2)
+        self.assertTrue(all(len(b) <= srt_examples.SRT_PAYLOAD_SIZE for b in batches))
+        unpacked = [m for batch in batches for m in srt_examples.unpack_messages(batch)]
+        self.assertEqual(unpacked, messages)
+
+    def test_message_filling_payload_exactly(self):
+        message = b"x" * (srt_examples.SRT_PAYLOAD_SIZE - 2)
+        batches = srt_examples.batch_messages([message])
+        self.assertEqual([len(b) for b in batches], [srt_examples.SRT_PAYLOAD_SIZE])
+
+    def test_oversized_message_rejected(self):
+        for size in (srt_examples.SRT_PAYLOAD_SIZE - 1, 2000, 70000):
+            with self.assertRaises(ValueError):
+                srt_examples.batch_messages([b"x" * size])
+
+    def test_unpack_empty(self):
+        self.assertEqual(srt_examples.unpack_messages(b""), [])
+
+    def test_unpack_truncated_prefix(self):
+        with self.assertRaises(ValueError):
+            srt_examples.unpack_messages(b"X")
+        with self.assertRaises(ValueError):
+            srt_examples.unpack_messages(b"\x00\x01a\x00")
+
+    def test_unpack_overlong_frame(self):
+        with self.assertRaises(ValueError):
+            srt_examples.unpack_messages(b"\x00\x05abc")
+
+    def test_unpack_unframed_payload(self):
+        # Plain text from the C++ srt_example peers isn't length-prefixed
+        with self.assertRaises(ValueError):
+            srt_examples.unpack_messages(b"Caller message 0")
+
+
+if __name__ == "__main__":
+    unittest.main()